@@ -1,8 +1,12 @@
 import os
 import sys
 import logging
-from PIL import Image, ImageFilter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import multiprocessing
+import time
+import shutil
+from logging.handlers import QueueHandler, QueueListener
+from PIL import Image, ImageFilter, features
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
 class Defaults:
     """
@@ -18,6 +22,15 @@ class Defaults:
         OUTPUT_FOLDER (str): The name of the folder where processed images will be saved. Default is "revised images".
         KEEP_EXTENSION (str): The string used to indicate that the original file extension should be retained. Default is "org".
         VALID_EXTENSIONS (list): A list of valid image file extensions that the program can process. Defaults include 'jpg', 'jpeg', 'bmp', 'png', 'webp'.
+        PROCESS_POOL_THRESHOLD (int): The minimum number of images for which worker processes are used instead of threads. Default is 4.
+        PROGRESS_INTERVAL (int): The number of processed images between progress messages. Default is 100.
+        PROGRESS_SECONDS (float): The maximum time in seconds between progress messages. Default is 1.
+        JPEG_QUALITY (int): The quality used when saving JPEG images. Default is 85.
+        JPEG_SUBSAMPLING (int): The chroma subsampling used when saving JPEG images. Default is 2 (4:2:0).
+        PNG_COMPRESS_LEVEL (int): The zlib compression level used when saving PNG images. Default is 1 (fastest).
+        WEBP_METHOD (int): The encoder method used when saving WEBP images, from 0 (fastest) to 6 (smallest). Default is 0.
+        BATCH_SIZE (int): The maximum number of images handed to a worker at once. Default is 32.
+        REDUCING_GAP (float): How much larger than the target an image must be before it is first reduced by an integer factor, which is much cheaper than a full Lanczos resize. Default is 3.0.
     """
     SIZE = 300
     SMALLEST_SIZE = 25
@@ -28,6 +41,19 @@ class Defaults:
     OUTPUT_FOLDER = "revised images"
     KEEP_EXTENSION = "org"
     VALID_EXTENSIONS = ['jpg', 'jpeg', 'bmp', 'png', 'webp']
+    PROCESS_POOL_THRESHOLD = 4
+    PROGRESS_INTERVAL = 100
+    PROGRESS_SECONDS = 1
+    JPEG_QUALITY = 85
+    JPEG_SUBSAMPLING = 2
+    PNG_COMPRESS_LEVEL = 1
+    WEBP_METHOD = 0
+    BATCH_SIZE = 32
+    REDUCING_GAP = 3.0
+
+
+# Lowercased extensions without the dot, built once instead of for every file
+_VALID_SET = frozenset(Defaults.VALID_EXTENSIONS)
 
 
 def main():
@@ -44,9 +70,14 @@ def main():
     extension = get_extension_input()
 
     output_folder = os.path.join(input_folder, Defaults.OUTPUT_FOLDER)
-    make_output_folder(output_folder)
+    log_listener = make_output_folder(output_folder)
 
-    folder_to_process(input_folder, size, extension, output_folder)
+    try:
+        folder_to_process(input_folder, size, extension, output_folder,
+                          log_listener.queue if log_listener else None)
+    finally:
+        if log_listener:
+            log_listener.stop()
 
 
 
@@ -55,13 +86,13 @@ def make_output_folder(output_folder):
     """Create the output folder if it does not exist.
 
     :param output_folder: The path to the output folder.
-    :returns: None
+    :returns: The listener writing the log file, or None if the folder could not be created.
 
     If the folder cannot be created, an error message is logged.
     """
     try:
         os.makedirs(output_folder, exist_ok=True)
-        setup_logging(output_folder)
+        return setup_logging(output_folder)
     except Exception as e:
         print(f"Could not create the output folder: {e}")
         logging.basicConfig(
@@ -70,21 +101,43 @@ def make_output_folder(output_folder):
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         logging.error(f"Error creating output folder: {e}")
-        return
+        return None
 
 
 def setup_logging(output_folder):
     """Set up logging to a file in the specified output folder.
 
+    Log records are put on a queue and written to the file by a listener thread in the
+    main process, so workers never wait on the file.
+
     :param output_folder: The path to the output folder where the log file will be saved.
-    :returns: None
+    :returns: The started QueueListener. Its queue is passed to the workers, and it must be
+              stopped once processing is done to flush the remaining records.
     """
     log_file_path = os.path.join(output_folder, 'image_processing.txt')
-    logging.basicConfig(
-        filename=log_file_path,
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
+    file_handler = logging.FileHandler(log_file_path)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    log_listener = QueueListener(multiprocessing.Queue(), file_handler)
+    log_listener.start()
+    setup_queue_logging(log_listener.queue)
+
+    logging.info(f"libjpeg-turbo available: {features.check_feature('libjpeg_turbo')}")
+
+    return log_listener
+
+
+def setup_queue_logging(log_queue):
+    """Send all log records of the current process to the given queue.
+
+    Used for the main process and as the initializer of each worker process.
+
+    :param log_queue: The queue read by the QueueListener that writes the log file.
+    :returns: None
+    """
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [QueueHandler(log_queue)]
+    root_logger.setLevel(logging.INFO)
 
 
 def get_size_input():
@@ -152,15 +205,31 @@ def process_image(input_path, output_path, size, extension):
         print(f"Error opening {input_path}: {e}")
         return
 
+    # Image.open only reads the header, so the size and format are known before any pixels
+    # are decoded. Decoding is deferred until the first resize or conversion below.
     original_width, original_height = original_image.size
+    image_format = original_image.format
+
+    extension = "JPEG" if extension == "JPG" else extension
+
+    # The image already has the desired size and format, so it can be copied as is
+    if original_width == size and original_height == size and image_format == extension:
+        original_image.close()
+        copy_image(input_path, output_path)
+        return
+
+    # Let the JPEG decoder downscale while decoding, keeping at least twice the target size
+    # for the final resize. The aspect ratio is kept, so the size read above is still valid.
+    # Multi-picture camera JPEGs are reported as MPO and are decoded the same way.
+    # Other formats have no reduced-scale decoding and are shrunk by the resize itself.
+    if image_format in ('JPEG', 'MPO'):
+        original_image.draft('RGB', (size * 2, size * 2))
 
     if is_square(original_width, original_height):
         final_image = resize_image(original_image, size)
     else:
         final_image = create_blurred_overlay(original_image, size)
 
-    extension = "JPEG" if extension == "JPG" else extension
-
     save_image(final_image, output_path, extension)
 
 
@@ -181,7 +250,7 @@ def resize_image(image, size):
     :param size: The size to which the image will be resized.
     :returns: The resized image.
     """
-    resized_image = image.resize((size, size), Image.LANCZOS)
+    resized_image = image.resize((size, size), Image.LANCZOS, reducing_gap=Defaults.REDUCING_GAP)
     return resized_image.convert('RGBA')
 
 
@@ -192,27 +261,47 @@ def create_blurred_overlay(image, size):
     :param size: The size for the resized image.
     :returns: The image with a blurred for use in the background.
     """
-    resized_image = image.resize((size, size), Image.LANCZOS)
-
-    # Convert to a suitable mode before applying Gaussian blur
-    resized_image = resized_image.convert("RGB") if resized_image.mode not in ("RGB", "L") else resized_image
+    # Convert once and reuse it for both the background and the foreground
+    rgb_image = image if image.mode == "RGB" else image.convert("RGB")
+
+    # The detail Lanczos preserves is blurred away, so the cheaper bilinear filter is enough here.
+    # GaussianBlur itself already runs as three running-sum box blur passes.
+    if image.mode in ('RGBA', 'LA', 'PA'):
+        # Resize before dropping the alpha band: the resize premultiplies alpha, so colors hidden
+        # under fully transparent pixels come out black instead of bleeding into the background.
+        resized_image = image.resize((size, size), Image.BILINEAR).convert("RGB")
+    else:
+        resized_image = rgb_image.resize((size, size), Image.BILINEAR)
 
     blurred_image = resized_image.filter(ImageFilter.GaussianBlur(radius=Defaults.BLUR))
 
-    white_overlay = create_white_overlay(blurred_image.size)
-    blurred_with_white = Image.alpha_composite(blurred_image.convert('RGBA'), white_overlay)
+    blurred_with_white = apply_white_tint(blurred_image)
 
-    resized_original = resize_original(image, size)
+    # Keep the original mode when it is transparent so the background shows through
+    resized_original = resize_original(image if has_transparency(image) else rgb_image, size)
 
     return compose_final_image(blurred_with_white, resized_original)
 
-def create_white_overlay(size):
-    """Create a white overlay with transparency.
 
-    :param size: The size of the overlay.
-    :returns: An image that is a white overlay with the specified size.
+def has_transparency(image):
+    """Check if the image has transparency information.
+
+    :param image: The image to check.
+    :returns: True if the image has an alpha channel or a transparent color, otherwise False.
+    """
+    return image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+
+
+def apply_white_tint(image):
+    """Lighten the image as if a transparent white overlay was placed on top of it.
+
+    The blend is applied through a lookup table in a single pass, so no overlay image
+    has to be allocated and composited.
+
+    :param image: The image to tint.
+    :returns: The tinted image.
     """
-    return Image.new('RGBA', size, (255, 255, 255, int(255 * Defaults.WHITE_TRANSPARENCY)))
+    return image.point(lambda value: value + (255 - value) * Defaults.WHITE_TRANSPARENCY)
 
 
 def resize_original(image, max_size):
@@ -225,23 +314,25 @@ def resize_original(image, max_size):
     original_width, original_height = image.size
     scale = max_size / max(original_width, original_height)
     new_size = (int(original_width * scale), int(original_height * scale))
-    return image.resize(new_size, Image.LANCZOS)
+    return image.resize(new_size, Image.LANCZOS, reducing_gap=Defaults.REDUCING_GAP)
 
 
 def compose_final_image(blurred_with_white, resized_original):
     """Compose the final image with the blurred overlay and the resized original.
 
-    :param blurred_with_white: The image with the blurred overlay.
+    :param blurred_with_white: The image with the blurred overlay, used as the canvas.
     :param resized_original: The resized original image.
     :returns: The final composed image.
     """
-    final_image = Image.new('RGBA', blurred_with_white.size)
-    final_image.paste(blurred_with_white, (0, 0))
+    final_image = blurred_with_white
 
     x_offset = (final_image.width - resized_original.width) // 2
     y_offset = (final_image.height - resized_original.height) // 2
-    final_image.paste(resized_original.convert('RGBA'), (x_offset,
-                      y_offset), resized_original.convert('RGBA'))
+    if has_transparency(resized_original):
+        rgba_original = resized_original if resized_original.mode == 'RGBA' else resized_original.convert('RGBA')
+        final_image.paste(rgba_original, (x_offset, y_offset), rgba_original)
+    else:
+        final_image.paste(resized_original, (x_offset, y_offset))
 
     return final_image
 
@@ -257,37 +348,127 @@ def save_image(image, output_path, extension):
     The function counts and logs how many images were processed.
     """
     try:
-        image = image.convert('RGB') if extension == "JPEG" else image
-
-        # Ensure the output path is unique
-        output_path = get_unique_output_path(output_path)
+        image = image.convert('RGB') if extension == "JPEG" and image.mode != 'RGB' else image
 
-
-        image.save(output_path, format=extension)  # Use the passed extension (already uppercase)
+        image.save(output_path, format=extension, **get_save_options(extension))  # Use the passed extension (already uppercase)
         logging.info(f"Saved: {output_path}")
-        print(f"Saved: {output_path}")
     except Exception as e:
         logging.error(f"Error saving {output_path}: {e}")
         print(f"Error saving {output_path}: {e}")
 
 
-def get_unique_output_path(output_path):
-    """Generate a unique output path by appending (1), (2), ... if a file already exists.
+def copy_image(input_path, output_path):
+    """Copy an image that needs no processing to the specified path.
+
+    :param input_path: The path to the input image.
+    :param output_path: The path where the image will be saved.
+    :returns: None
+    """
+    try:
+        shutil.copyfile(input_path, output_path)
+        logging.info(f"Copied: {output_path}")
+    except Exception as e:
+        logging.error(f"Error copying {input_path} to {output_path}: {e}")
+        print(f"Error copying {input_path} to {output_path}: {e}")
+
+
+def get_save_options(extension):
+    """Get the encoder options used to save an image in the given format.
+
+    The options favor encoding speed, which matters most when saving large batches.
+
+    :param extension: The uppercase file format the image will be saved in.
+    :returns: A dictionary of keyword arguments for Image.save.
+    """
+    if extension == "JPEG":
+        return {'quality': Defaults.JPEG_QUALITY, 'subsampling': Defaults.JPEG_SUBSAMPLING,
+                'optimize': False, 'progressive': False}
+    if extension == "PNG":
+        return {'compress_level': Defaults.PNG_COMPRESS_LEVEL}
+    if extension == "WEBP":
+        return {'method': Defaults.WEBP_METHOD}
+    return {}
+
+
+def get_unique_output_path(output_path, used_names):
+    """Generate a unique output path by appending (1), (2), ... if the file name is already used.
 
     :param output_path: The base output path for the image.
+    :param used_names: A set of normalized file names that exist or are reserved in the output folder.
+                       The returned file name is added to it.
     :returns: A unique output path.
     """
-    base, extension = os.path.splitext(output_path)
+    output_folder, filename = os.path.split(output_path)
+    base, extension = os.path.splitext(filename)
     counter = 1
 
-    while os.path.exists(output_path):
-        output_path = f"{base} ({counter}){extension}"
+    while os.path.normcase(filename) in used_names:
+        filename = f"{base} ({counter}){extension}"
         counter += 1
 
-    return output_path
+    used_names.add(os.path.normcase(filename))
+    return os.path.join(output_folder, filename)
+
+
+def _process_batch(batch):
+    """Process a batch of images in a single worker task.
+
+    :param batch: A list of argument tuples for process_image.
+    :returns: The number of images in the batch.
+
+    An error while processing one image is logged and does not stop the rest of the batch.
+    """
+    for task in batch:
+        try:
+            process_image(*task)
+        except Exception as e:
+            logging.error(f"Error processing {task[0]}: {e}")
+            print(f"Error processing {task[0]}: {e}")
+    return len(batch)
+
+
+def get_batch_size(task_count):
+    """Get the number of images to submit to the executor as a single task.
 
+    Batching spreads the cost of each submission over several images, while keeping
+    enough batches per worker for the load to stay balanced.
 
-def folder_to_process(input_folder, size, extension, output_folder):
+    :param task_count: The number of images that will be processed.
+    :returns: The batch size, between 1 and Defaults.BATCH_SIZE.
+    """
+    return max(1, min(Defaults.BATCH_SIZE, task_count // (get_worker_count() * 4)))
+
+
+def get_worker_count():
+    """Get the number of worker processes a ProcessPoolExecutor starts by default.
+
+    :returns: The CPU count, limited to 61 on Windows where more workers are not supported.
+    """
+    workers = os.cpu_count() or 1
+    return min(workers, 61) if sys.platform == 'win32' else workers
+
+
+def create_executor(task_count, log_queue=None):
+    """Create the executor used to process a batch of images.
+
+    Worker processes are used so that several images can be processed at the same time
+    on multi-core machines. For small batches the cost of starting the processes outweighs
+    the gain, so threads are used instead.
+
+    :param task_count: The number of images that will be processed.
+    :param log_queue: The queue the worker processes send their log records to, if any.
+    :returns: A ProcessPoolExecutor or a ThreadPoolExecutor.
+    """
+    if task_count < Defaults.PROCESS_POOL_THRESHOLD:
+        return ThreadPoolExecutor()
+
+    if log_queue is None:
+        return ProcessPoolExecutor()
+
+    return ProcessPoolExecutor(initializer=setup_queue_logging, initargs=(log_queue,))
+
+
+def folder_to_process(input_folder, size, extension, output_folder, log_queue=None):
     """Process all images in the specified folder in parallel to handle multiple
     images at once, improving performance when processing large batches.
 
@@ -295,26 +476,49 @@ def folder_to_process(input_folder, size, extension, output_folder):
     :param size: The size to which the images will be resized.
     :param extension: The desired output file extension.
     :param output_folder: The folder where processed images will be saved.
+    :param log_queue: The queue worker processes send their log records to, if any.
     :returns: None
 
     Errors during processing are logged, and a summary of processed images is displayed.
     """
     processed_count = 0
 
-
-
-    with ThreadPoolExecutor() as executor:
-        futures = []
-        for filename in os.listdir(input_folder):
-            if filename.lower().endswith(tuple(Defaults.VALID_EXTENSIONS)):
-                input_path = os.path.join(input_folder, filename)
-                output_extension = filename.split('.')[-1].lower() if extension == Defaults.KEEP_EXTENSION else extension
-                output_filename = f"{os.path.splitext(filename)[0]}.{output_extension}"
-                output_path = os.path.join(output_folder, output_filename)
-                futures.append(executor.submit(process_image, input_path, output_path, size, output_extension.upper()))
-
-        for _ in as_completed(futures):
-            processed_count += 1
+    # Output names are reserved here, before any work is submitted, so workers never race for the same name
+    try:
+        used_names = {os.path.normcase(name) for name in os.listdir(output_folder)}
+    except OSError:
+        used_names = set()
+
+    tasks = []
+    # DirEntry caches the file type from the directory listing, so only symlinks need a stat call
+    with os.scandir(input_folder) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stem, ext = os.path.splitext(entry.name)
+            ext_lower = ext[1:].lower()
+            if ext_lower not in _VALID_SET:
+                continue
+            output_extension = ext_lower if extension == Defaults.KEEP_EXTENSION else extension
+            output_path = get_unique_output_path(os.path.join(output_folder, f"{stem}.{output_extension}"), used_names)
+            tasks.append((entry.path, output_path, size, output_extension.upper()))
+
+    batch_size = get_batch_size(len(tasks))
+
+    with create_executor(len(tasks), log_queue) as executor:
+        futures = [executor.submit(_process_batch, tasks[i:i + batch_size]) for i in range(0, len(tasks), batch_size)]
+
+        # Report progress periodically instead of printing a line for every image
+        last_progress = time.monotonic()
+        last_progress_count = 0
+        for future in as_completed(futures):
+            processed_count += future.result()
+            now = time.monotonic()
+            if (processed_count - last_progress_count >= Defaults.PROGRESS_INTERVAL
+                    or now - last_progress >= Defaults.PROGRESS_SECONDS):
+                print(f"Processed {processed_count} of {len(tasks)} images...")
+                last_progress = now
+                last_progress_count = processed_count
 
     if processed_count == 0:
         logging.warning("No images processed. Please check the input folder for valid image files.")
@@ -324,6 +528,8 @@ def folder_to_process(input_folder, size, extension, output_folder):
         print(f"Processed {processed_count} images.")
 
 if __name__ == "__main__":
+    # Required for worker processes when running as a frozen executable
+    multiprocessing.freeze_support()
     main()
     # Check if the script is running in a console or as an executable
     if sys.stdout.isatty() and hasattr(sys, 'frozen'):  # Running as an EXE